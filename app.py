@@ -1,20 +1,32 @@
 import streamlit as st
-import pandas as pd
-from sqlalchemy import create_engine, text
+from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
+from streamlit.runtime.scriptrunner_utils.script_run_context import SCRIPT_RUN_CONTEXT_ATTR_NAME
+from sqlalchemy import String, bindparam, create_engine, text
 from urllib.parse import quote_plus
 import os
+import io
 import datetime
+import concurrent.futures
 import logging
-import bcrypt
+import threading
 
 # --- Configuration ---
 # Use st.secrets for Streamlit Cloud deployment
 try:
     db_conf = st.secrets["database"]
     log_conf = st.secrets["logging"]
+    app_conf = st.secrets.get("app", {})
+    EXPORT_MAX_ROWS = max(1, int(app_conf.get("export_max_rows", 50_000)))
+    # 新建用户的 bcrypt 成本因子：低于 10 不够安全，高于 14 会超过登录/建用户的超时时间
+    BCRYPT_ROUNDS = int(app_conf.get("bcrypt_rounds", 11))
+    if not 10 <= BCRYPT_ROUNDS <= 14:
+        raise ValueError(f"app.bcrypt_rounds must be between 10 and 14, got {BCRYPT_ROUNDS}")
 except KeyError as e:
     st.error(f"Missing configuration in `st.secrets`: {e}. Please configure your Streamlit Cloud secrets.")
     st.stop()
+except (TypeError, ValueError) as e:
+    st.error(f"Invalid configuration in `st.secrets`: {e}. Please check your Streamlit Cloud secrets.")
+    st.stop()
 
 
 # --- Logging Setup ---
@@ -45,16 +57,26 @@ logger = setup_logging()
 
 
 # --- Database Engine Creation ---
+_DB_URI = (
+    f"mysql+pymysql://{db_conf['user']}:{quote_plus(db_conf['password'])}@"
+    f"{db_conf['host']}:{db_conf['port']}/{db_conf['name']}"
+    f"?charset=utf8mb4&connect_timeout=5&read_timeout=30"
+)
+
+
 @st.cache_resource
 def get_db_engine():
     """Creates and caches the database engine."""
-    encoded_password = quote_plus(db_conf["password"])
-    db_uri = (
-        f"mysql+pymysql://{db_conf['user']}:{encoded_password}@"
-        f"{db_conf['host']}:{db_conf['port']}/{db_conf['name']}?charset=utf8mb4"
-    )
     try:
-        engine = create_engine(db_uri)
+        engine = create_engine(
+            _DB_URI,
+            pool_size=10,
+            max_overflow=10,
+            pool_pre_ping=True,
+            pool_recycle=1800,
+            pool_timeout=30,
+            query_cache_size=1200,
+        )
         logger.info("Database engine created successfully.")
         return engine
     except Exception as e:
@@ -65,6 +87,48 @@ def get_db_engine():
 
 engine = get_db_engine()
 
+
+@st.cache_resource
+def get_bcrypt_pool():
+    """Creates and caches the thread pool shared by all sessions for bcrypt work."""
+    # bcrypt 在原生代码中释放 GIL，放到线程池里执行不会阻塞其他会话
+    return concurrent.futures.ThreadPoolExecutor(max_workers=4, thread_name_prefix="bcrypt")
+
+
+@st.cache_resource(show_spinner=False)
+def ensure_users_index():
+    """Creates a unique index on users.username once per process if none exists.
+
+    Raises on failure so that a failed attempt is not cached and is retried on the next call.
+    """
+    with engine.begin() as conn:
+        exists = conn.execute(text(
+            "SELECT 1 FROM information_schema.STATISTICS "
+            "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'users' "
+            "AND COLUMN_NAME = 'username' AND SEQ_IN_INDEX = 1 AND NON_UNIQUE = 0 LIMIT 1"
+        )).fetchone()
+        if not exists:
+            conn.execute(text("CREATE UNIQUE INDEX idx_users_username ON users (username)"))
+            logger.info("Created unique index idx_users_username on users(username).")
+    return True
+
+
+def check_users_index():
+    """Ensures the users.username index exists, logging instead of failing the page."""
+    try:
+        ensure_users_index()
+    except Exception as e:
+        logger.warning(f"Could not ensure index on users(username): {e}")
+
+
+LOGIN_STMT = text("SELECT username, password_hash, role FROM users WHERE username = :username")
+
+PAGE_SIZE_OPTIONS = [100, 500, 1000, 5000]
+PAGE_SQL = " LIMIT :page_size OFFSET :offset"
+FILTER_WORKERS = 4
+
+BCRYPT_TIMEOUT = 5
+
 # --- Session State Initialization ---
 if "logged_in" not in st.session_state:
     st.session_state.logged_in = False
@@ -75,6 +139,8 @@ if "logged_in" not in st.session_state:
 # --- Login, Logout, and Auth Functions ---
 def login():
     """Renders the login page."""
+    import bcrypt
+
     st.title("🔐 登录系统")
     username = st.text_input("用户名")
     password = st.text_input("密码", type="password")
@@ -84,14 +150,17 @@ def login():
             st.error("用户名和密码不能为空。")
             return
 
+        check_users_index()
         with engine.connect() as conn:
-            user_query = text("SELECT username, password_hash, role FROM users WHERE username = :username")
-            user_data = conn.execute(user_query, {"username": username}).fetchone()
+            user_data = conn.execute(LOGIN_STMT, {"username": username}).fetchone()
 
         if user_data:
             db_username, db_hash, db_role = user_data
             try:
-                if bcrypt.checkpw(password.encode('utf-8'), db_hash.encode('utf-8')):
+                password_ok = get_bcrypt_pool().submit(
+                    bcrypt.checkpw, password.encode('utf-8'), db_hash.encode('utf-8')
+                ).result(timeout=BCRYPT_TIMEOUT)
+                if password_ok:
                     st.session_state.logged_in = True
                     st.session_state.username = db_username
                     st.session_state.role = db_role
@@ -101,6 +170,9 @@ def login():
                 else:
                     st.error("用户名或密码错误")
                     logger.warning(f"用户尝试登录失败：用户名 '{username}'，密码不正确")
+            except concurrent.futures.TimeoutError:
+                st.error("服务器繁忙，请稍后重试。")
+                logger.error(f"用户 '{username}' 密码验证超时（超过 {BCRYPT_TIMEOUT} 秒）")
             except Exception as e:
                 st.error("用户名或密码错误")
                 logger.error(f"用户 '{username}' 密码验证失败：{e}")
@@ -115,6 +187,8 @@ def logout():
     st.session_state.logged_in = False
     st.session_state.username = ""
     st.session_state.role = ""
+    st.session_state.pop("last_query", None)
+    st.session_state.pop("last_df", None)
     st.rerun()
 
 
@@ -132,6 +206,10 @@ def main_app():
     st.sidebar.write(f"👤 **当前用户：** {st.session_state.username} ({st.session_state.role})")
     if st.sidebar.button("退出登录"):
         logout()
+    if st.session_state.role == "admin" and st.sidebar.button("刷新表结构缓存"):
+        clear_metadata_cache()
+        logger.info(f"管理员 '{st.session_state.username}' 清除了表结构缓存")
+        st.rerun()
 
     st.title("仪表盘")
 
@@ -156,18 +234,101 @@ def main_app():
             user_management()
 
 
-def get_tables():
-    """Fetches a list of all tables from the database."""
+@st.cache_data(ttl=300)
+def list_tables():
+    """Fetches and caches a list of all tables from the database."""
     with engine.connect() as conn:
         result = conn.execute(text("SHOW TABLES"))
         return [row[0] for row in result.fetchall()]
 
 
+@st.cache_data(ttl=300)
+def describe_table(table_name):
+    """Fetches and caches the column metadata of a table."""
+    import pandas as pd
+
+    return pd.read_sql(
+        text(
+            "SELECT COLUMN_NAME AS Field, COLUMN_TYPE AS Type, COLUMN_KEY AS `Key` FROM information_schema.COLUMNS "
+            "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = :table_name ORDER BY ORDINAL_POSITION"
+        ),
+        engine,
+        params={"table_name": table_name},
+    )
+
+
+@st.cache_data(ttl=300, show_spinner=False)
+def indexed_columns(table_name):
+    """Fetches and caches the set of columns that lead an index on a table."""
+    with engine.connect() as conn:
+        result = conn.execute(
+            text(
+                "SELECT DISTINCT COLUMN_NAME FROM information_schema.STATISTICS "
+                "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = :table_name AND SEQ_IN_INDEX = 1"
+            ),
+            {"table_name": table_name},
+        )
+        return {row[0] for row in result.fetchall()}
+
+
+@st.cache_data(ttl=600, show_spinner=False)
+def distinct_values(table_name, field):
+    """Fetches and caches the distinct values of a column for filter options."""
+    import pandas as pd
+
+    if field in indexed_columns(table_name):
+        # 有索引时 GROUP BY 可走松散索引扫描
+        query = f"SELECT `{field}` FROM `{table_name}` GROUP BY `{field}` ORDER BY NULL LIMIT 1000"
+    else:
+        # 无索引时只对前 50000 行取样，避免全表扫描
+        query = (
+            f"SELECT DISTINCT `{field}` FROM "
+            f"(SELECT `{field}` FROM `{table_name}` LIMIT 50000) AS s LIMIT 1000"
+        )
+    df = pd.read_sql(text(query), engine)
+    return df[field].dropna().unique().tolist()
+
+
+@st.cache_resource
+def get_filter_pool():
+    """Creates and caches the thread pool shared by all sessions for filter-option lookups."""
+    # 线程数远小于连接池大小，避免冷缓存时单个会话占满连接池
+    return concurrent.futures.ThreadPoolExecutor(max_workers=FILTER_WORKERS, thread_name_prefix="filter")
+
+
+def _run_with_ctx(ctx, fn, *args):
+    """Runs fn in a pool thread with the caller's script run context attached."""
+    thread = threading.current_thread()
+    add_script_run_ctx(thread, ctx)
+    try:
+        return fn(*args)
+    finally:
+        # 线程长期存活，必须清掉上下文，否则会一直持有调用方会话的 session_state
+        setattr(thread, SCRIPT_RUN_CONTEXT_ATTR_NAME, None)
+
+
+def fetch_filter_options(table_name, fields):
+    """Fetches distinct values for several columns concurrently over the connection pool.
+
+    Returns a dict mapping each field to a future of its options.
+    """
+    ctx = get_script_run_ctx()
+    pool = get_filter_pool()
+    return {field: pool.submit(_run_with_ctx, ctx, distinct_values, table_name, field) for field in fields}
+
+
+def clear_metadata_cache():
+    """Invalidates the cached table and column metadata."""
+    list_tables.clear()
+    describe_table.clear()
+    indexed_columns.clear()
+
+
 def data_query():
     """Renders the data query section."""
     st.header("📊 数据查询")
 
-    tables = get_tables()
+    tables = list_tables()
     selected_table = st.selectbox("请选择数据表", tables)
 
     if not selected_table:
@@ -176,8 +337,9 @@ def data_query():
 
     with st.spinner(f"正在获取表结构 {selected_table}..."):
         try:
-            columns_df = pd.read_sql(text(f"SHOW COLUMNS FROM `{selected_table}`"), engine)
+            columns_df = describe_table(selected_table)
             cols = columns_df["Field"].tolist()
+            pk_cols = columns_df.loc[columns_df["Key"] == "PRI", "Field"].tolist()
         except Exception as e:
             st.error(f"获取表列失败：{e}")
             logger.error(f"获取表 '{selected_table}' 的列失败：{e}")
@@ -204,11 +366,10 @@ def data_query():
     filters = {}
 
     with st.expander("显示/隐藏筛选器"):
+        option_futures = fetch_filter_options(selected_table, filterable_fields)
         for field in filterable_fields:
             try:
-                unique_values = pd.read_sql(text(f"SELECT DISTINCT `{field}` FROM `{selected_table}` LIMIT 1000"),
-                                            engine)
-                options = unique_values[field].dropna().unique().tolist()
+                options = option_futures[field].result()
                 selected_vals = st.multiselect(
                     f"按 '{field}' 筛选 (可多选)",
                     options=options,
@@ -223,79 +384,214 @@ def data_query():
                 if val.strip():
                     filters[field] = (val.strip(), "like")
 
-    where_clauses, params = [], {}
-    if date_field and start_date and end_date:
-        where_clauses.append(f"`{date_field}` BETWEEN :start_date AND :end_date")
-        params["start_date"] = start_date.strftime("%Y-%m-%d")
-        params["end_date"] = end_date.strftime("%Y-%m-%d")
-
-    for field, (value, match_type) in filters.items():
-        if match_type == "in_list" and value:
-            placeholders = ', '.join([f':{field}_{i}' for i in range(len(value))])
-            where_clauses.append(f"`{field}` IN ({placeholders})")
-            for i, val in enumerate(value):
-                params[f'{field}_{i}'] = val
-        elif match_type == "like" and value:
-            where_clauses.append(f"`{field}` LIKE :{field}")
-            params[field] = f"%{value}%"
-
-    where_sql = " AND ".join(where_clauses)
-    query = f"SELECT * FROM `{selected_table}`"
-    if where_sql:
-        query += f" WHERE {where_sql}"
-    query += " LIMIT 1000"
+    pivot_option = False
+    if 'tag' in cols and 'value' in cols and date_field:
+        pivot_option = st.checkbox(
+            "将 'tag' 列转换为独立列 (Excel三维表格式)",
+            value=False
+        )
+
+    col_size, col_page = st.columns(2)
+    page_size = col_size.selectbox("每页行数", PAGE_SIZE_OPTIONS, index=PAGE_SIZE_OPTIONS.index(1000))
+    page = col_page.number_input("页码", min_value=1, value=1, step=1)
 
+    # 仅在点击查询时访问数据库；其余重跑（如切换分页控件、下载）复用上次结果
     if st.button("执行查询"):
+        params = {}
+        if date_field and start_date and end_date:
+            params["start_date"] = start_date.strftime("%Y-%m-%d")
+            params["end_date"] = end_date.strftime("%Y-%m-%d")
+
+        for i, (value, match_type) in enumerate(filters.values()):
+            params[f"f_{i}"] = value if match_type == "in_list" else f"%{value}%"
+
+        filter_spec = tuple((field, match_type) for field, (_, match_type) in filters.items())
+        where_sql, expanding = build_where_sql(date_field, filter_spec)
+        page_params = {"page_size": page_size, "offset": (page - 1) * page_size}
+
         with st.spinner("正在获取数据..."):
             try:
-                df = pd.read_sql(text(query), engine, params=params)
-                st.write(f"查询结果（最多1000条） 共计 {len(df)} 行")
-
-                if not df.empty:
-                    display_data(df, selected_table, date_field)
+                if pivot_option:
+                    tags = pivot_tags(selected_table, where_sql, expanding, params)
+                    query, tag_params = build_pivot_query(selected_table, date_field, tags, where_sql)
+                    params = {**params, **tag_params}
+                    df = read_query(query + PAGE_SQL, expanding, {**params, **page_params})
                 else:
-                    st.info("根据所选筛选条件未找到数据。")
+                    # 分页需要确定的排序：日期列优先，主键兜底保证相同日期的行顺序稳定
+                    order_cols = ([date_field] if date_field else []) + [c for c in pk_cols if c != date_field]
+                    order_sql = ", ".join(f"`{c}`" for c in (order_cols or cols[:1]))
+                    query = f"SELECT * FROM `{selected_table}`"
+                    if where_sql:
+                        query += f" WHERE {where_sql}"
+                    query += f" ORDER BY {order_sql}"
+                    df = read_query(query + PAGE_SQL, expanding, {**params, **page_params})
+
+                st.session_state.last_df = df
+                st.session_state.last_query = {
+                    "table": selected_table,
+                    "pivot": pivot_option,
+                    "page": page,
+                    "page_size": page_size,
+                    "query": query,
+                    "expanding": expanding,
+                    "params": params,
+                }
                 logger.info(f"用户 '{st.session_state.username}' 成功查询表 '{selected_table}'。")
             except Exception as e:
+                st.session_state.pop("last_query", None)
+                st.session_state.pop("last_df", None)
                 st.error(f"查询失败：{e}")
                 logger.error(f"用户 '{st.session_state.username}' 查询表 '{selected_table}' 失败：{e}")
 
+    last_query = st.session_state.get("last_query")
+    if last_query and last_query["table"] == selected_table:
+        df = st.session_state.last_df
+        st.write(f"查询结果 第 {last_query['page']} 页（每页最多 {last_query['page_size']} 条） 共计 {len(df)} 行")
+        if not df.empty:
+            display_data(df, selected_table, last_query["pivot"])
+            export_all(last_query, selected_table)
+        else:
+            st.info("根据所选筛选条件未找到数据。")
+
+
+def build_where_sql(date_field, filter_spec):
+    """Builds the WHERE clause for a date column and a tuple of (field, match_type) filters.
+
+    Filter values are bound as f_0, f_1, ... in filter order, so the SQL text only
+    depends on the filter shape. Returns the clause and the names of its IN-list parameters.
+    """
+    where_clauses, expanding = [], []
+    if date_field:
+        where_clauses.append(f"`{date_field}` BETWEEN :start_date AND :end_date")
+    for i, (field, match_type) in enumerate(filter_spec):
+        if match_type == "in_list":
+            where_clauses.append(f"`{field}` IN :f_{i}")
+            expanding.append(f"f_{i}")
+        elif match_type == "like":
+            where_clauses.append(f"`{field}` LIKE :f_{i}")
+    return " AND ".join(where_clauses), tuple(expanding)
+
+
+def prepare_query(query, expanding=()):
+    """Builds a text() statement, binding IN-list parameters as expanding."""
+    stmt = text(query)
+    if expanding:
+        stmt = stmt.bindparams(*[bindparam(name, expanding=True) for name in expanding])
+    return stmt
+
+
+def read_query(query, expanding, params):
+    """Runs a query and reads the result in chunks into Arrow-backed dtypes."""
+    import pandas as pd
+
+    return pd.concat(
+        pd.read_sql(prepare_query(query, expanding), engine, params=params,
+                    chunksize=500, dtype_backend="pyarrow"),
+        ignore_index=True,
+    )
+
+
+@st.cache_data(ttl=600, show_spinner=False)
+def pivot_tags(table_name, where_sql, expanding, params):
+    """Fetches and caches the distinct 'tag' values matching the current filters."""
+    query = f"SELECT DISTINCT `tag` FROM `{table_name}`"
+    if where_sql:
+        query += f" WHERE {where_sql}"
+    query += " ORDER BY `tag` LIMIT 1000"
+    with engine.connect() as conn:
+        result = conn.execute(prepare_query(query, expanding), params)
+        return [row[0] for row in result.fetchall() if row[0] is not None]
+
+
+def build_pivot_query(table_name, date_field, tags, where_sql):
+    """Builds a query that pivots 'tag'/'value' into columns with conditional aggregation.
+
+    Returns the SQL string and the bind parameters for the tag values.
+    """
+    tag_params = {}
+    select_cols = [f"`{date_field}`"]
+    for i, tag in enumerate(tags):
+        tag_params[f"pivot_tag_{i}"] = tag
+        alias = str(tag).replace("`", "``")
+        select_cols.append(f"MAX(CASE WHEN `tag` = :pivot_tag_{i} THEN `value` END) AS `{alias}`")
+
+    query = f"SELECT {', '.join(select_cols)} FROM `{table_name}`"
+    if where_sql:
+        query += f" WHERE {where_sql}"
+    query += f" GROUP BY `{date_field}` ORDER BY `{date_field}`"
+    return query, tag_params
+
+
+def stream_csv(query, expanding, params, max_rows):
+    """Streams up to max_rows rows of a query through a server-side cursor into CSV bytes.
+
+    Returns the CSV bytes, the number of rows written and whether more rows matched.
+    """
+    import pandas as pd
+
+    buf = io.BytesIO()
+    rows, truncated = 0, False
+    with engine.connect().execution_options(stream_results=True, yield_per=1000) as conn:
+        # 多取一行，用于判断结果是否真的超过上限
+        chunks = pd.read_sql(prepare_query(query + " LIMIT :export_limit", expanding), conn,
+                             params={**params, "export_limit": max_rows + 1}, chunksize=1000)
+        for i, chunk in enumerate(chunks):
+            if rows + len(chunk) > max_rows:
+                chunk = chunk.iloc[:max_rows - rows]
+                truncated = True
+            chunk.to_csv(buf, index=False, header=(i == 0), encoding="utf-8")
+            rows += len(chunk)
+    return buf.getvalue(), rows, truncated
+
+
+def export_all(last_query, selected_table):
+    """Offers a CSV export of all rows matching the last query, capped at EXPORT_MAX_ROWS."""
+    if st.button(f"📦 导出全部匹配结果（最多 {EXPORT_MAX_ROWS} 条）"):
+        with st.spinner("正在导出全部数据..."):
+            try:
+                csv_bytes, rows, truncated = stream_csv(
+                    last_query["query"], last_query["expanding"], last_query["params"], EXPORT_MAX_ROWS
+                )
+                if truncated:
+                    st.warning(f"结果超过导出上限，仅导出前 {EXPORT_MAX_ROWS} 条。")
+                suffix = "pivot_full_export" if last_query["pivot"] else "full_export"
+                st.download_button(
+                    label="📥 下载全部结果 CSV",
+                    data=csv_bytes,
+                    file_name=f"{selected_table}_{suffix}.csv",
+                    mime="text/csv"
+                )
+                logger.info(f"用户 '{st.session_state.username}' 导出了表 '{selected_table}' 的查询结果，共 {rows} 行。")
+            except Exception as e:
+                st.error(f"导出失败：{e}")
+                logger.error(f"用户 '{st.session_state.username}' 导出表 '{selected_table}' 失败：{e}")
+
+
+@st.cache_data(ttl=600, max_entries=32, show_spinner=False)
+def make_csv(df_hash, _df):
+    """Serializes a DataFrame to CSV bytes, cached by the frame's content hash."""
+    buf = io.BytesIO()
+    _df.to_csv(buf, index=False, encoding="utf-8", chunksize=10_000)
+    return buf.getvalue()
+
 
-def display_data(df, selected_table, date_field):
+def display_data(df, selected_table, pivot_option):
     """Handles data display and download options."""
-    st.subheader("查询结果")
+    import pandas as pd
 
-    pivot_option = False
-    if 'tag' in df.columns and 'value' in df.columns and date_field:
-        pivot_option = st.checkbox(
-            "将 'tag' 列转换为独立列 (Excel三维表格式)",
-            value=False
-        )
+    st.subheader("查询结果")
 
+    st.dataframe(df)
+    df_hash = (tuple(df.columns), int(pd.util.hash_pandas_object(df).sum()))
+    csv_bytes = make_csv(df_hash, df)
     if pivot_option:
-        try:
-            pivot_df = pd.pivot_table(
-                df,
-                index=date_field,
-                columns='tag',
-                values='value',
-                aggfunc='first'
-            ).reset_index()
-            st.dataframe(pivot_df)
-            csv_bytes = pivot_df.to_csv(index=False).encode("utf-8")
-            st.download_button(
-                label="📥 导出 CSV (三维表)",
-                data=csv_bytes,
-                file_name=f"{selected_table}_pivot_export.csv",
-                mime="text/csv"
-            )
-        except Exception as e:
-            st.error(f"透视表转换失败：{e}")
-            st.warning("请确保查询结果中包含时间字段、'tag' 列和 'value' 列。")
-            st.dataframe(df)
+        st.download_button(
+            label="📥 导出 CSV (三维表)",
+            data=csv_bytes,
+            file_name=f"{selected_table}_pivot_export.csv",
+            mime="text/csv"
+        )
     else:
-        st.dataframe(df)
-        csv_bytes = df.to_csv(index=False).encode("utf-8")
         st.download_button(
             label="📥 导出 CSV",
             data=csv_bytes,
@@ -306,31 +602,52 @@ def display_data(df, selected_table, date_field):
 
 def data_write():
     """Renders the data write section (Admin only)."""
+    import pandas as pd
+
     st.header("📝 数据写入（管理员权限）")
-    tables = get_tables()
+    tables = list_tables()
     selected_table = st.selectbox("选择要写入数据的表", tables)
 
     if not selected_table:
         st.info("请选择一个数据表。")
         return
 
-    columns_df = pd.read_sql(text(f"SHOW COLUMNS FROM `{selected_table}`"), engine)
+    columns_df = describe_table(selected_table)
+
+    fields = columns_df["Field"].tolist()
+    types = columns_df["Type"].tolist()
+    template = pd.DataFrame([{field: "" for field in fields}])
 
     with st.form("data_entry_form"):
-        new_data = {}
         st.subheader(f"为 `{selected_table}` 输入新数据")
-        for _, row in columns_df.iterrows():
-            new_data[row["Field"]] = st.text_input(f"{row['Field']} ({row['Type']})")
+        edited = st.data_editor(
+            template,
+            hide_index=True,
+            num_rows="fixed",
+            column_config={
+                field: st.column_config.TextColumn(f"{field} ({col_type})")
+                for field, col_type in zip(fields, types)
+            },
+            key=f"write_row_{selected_table}",
+        )
 
         submit = st.form_submit_button("提交数据")
         if submit:
+            new_data = {field: ("" if value is None else str(value)) for field, value in edited.iloc[0].items()}
             if all(v.strip() == "" for v in new_data.values()):
                 st.warning("⚠️ 不能提交空数据！")
             else:
                 try:
+                    text_cols = [
+                        field for field, col_type in zip(fields, types)
+                        if "char" in col_type.lower() or "text" in col_type.lower()
+                    ]
                     pd.DataFrame([new_data]).to_sql(
-                        selected_table, con=engine, if_exists="append", index=False
+                        selected_table, con=engine, if_exists="append", index=False, method="multi",
+                        chunksize=500, dtype={col: String() for col in text_cols}
                     )
+                    distinct_values.clear()
+                    pivot_tags.clear()
                     st.success("✅ 数据写入成功！")
                     logger.info(f"管理员 '{st.session_state.username}' 向表 '{selected_table}' 写入数据：{new_data}")
                 except Exception as e:
@@ -340,7 +657,11 @@ def data_write():
 
 def user_management():
     """Admin page for managing users."""
+    import bcrypt
+    import pandas as pd
+
     st.header("👥 用户管理（管理员权限）")
+    check_users_index()
 
     st.subheader("创建新用户")
     with st.form("new_user_form"):
@@ -354,18 +675,23 @@ def user_management():
                 st.warning("用户名和密码不能为空。")
             else:
                 try:
-                    password_hash = bcrypt.hashpw(new_password.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
+                    password_hash = get_bcrypt_pool().submit(
+                        bcrypt.hashpw, new_password.encode('utf-8'), bcrypt.gensalt(rounds=BCRYPT_ROUNDS)
+                    ).result(timeout=BCRYPT_TIMEOUT).decode('utf-8')
 
-                    with engine.connect() as conn:
+                    with engine.begin() as conn:
                         insert_query = text(
                             "INSERT INTO users (username, password_hash, role) VALUES (:username, :password_hash, :role)")
                         conn.execute(insert_query,
                                      {"username": new_username, "password_hash": password_hash, "role": new_role})
-                        conn.commit()
                     st.success(f"用户 '{new_username}' 创建成功！")
                     logger.info(
                         f"管理员 '{st.session_state.username}' 创建新用户 '{new_username}'，角色为 '{new_role}'。")
                     st.rerun()
+                except concurrent.futures.TimeoutError:
+                    st.error("服务器繁忙，请稍后重试。")
+                    logger.error(
+                        f"管理员 '{st.session_state.username}' 创建用户 '{new_username}' 时密码哈希超时（超过 {BCRYPT_TIMEOUT} 秒）")
                 except Exception as e:
                     st.error(f"创建用户失败：{e}")
                     logger.error(f"管理员 '{st.session_state.username}' 尝试创建用户 '{new_username}' 失败：{e}")
@@ -376,33 +702,47 @@ def user_management():
     try:
         users_df = pd.read_sql(text("SELECT id, username, role, created_at FROM users"), engine)
 
-        # 使用 st.columns 布局来展示用户列表
-        for _, row in users_df.iterrows():
-            col1, col2, col3, col4, col5 = st.columns([0.5, 1, 1, 2, 1])
-            col1.write(f"**ID:** {row['id']}")
-            col2.write(f"**用户名:** {row['username']}")
-            col3.write(f"**角色:** {row['role']}")
-            col4.write(f"**创建时间:** {row['created_at'].strftime('%Y-%m-%d %H:%M:%S')}")
-
-            if st.session_state.username != row['username']:
-                with col5:
-                    if st.button("删除", key=f"delete_{row['id']}"):
-                        try:
-                            with engine.connect() as conn:
-                                delete_query = text("DELETE FROM users WHERE id = :id")
-                                conn.execute(delete_query, {"id": row['id']})
-                                conn.commit()
-                            st.success(f"用户 '{row['username']}' 已被删除。")
-                            logger.info(
-                                f"管理员 '{st.session_state.username}' 删除了用户 '{row['username']}' (ID: {row['id']})。")
-                            st.rerun()
-                        except Exception as e:
-                            st.error(f"删除用户失败：{e}")
-                            logger.error(
-                                f"管理员 '{st.session_state.username}' 尝试删除用户 '{row['username']}' 失败：{e}")
+        users_df.insert(0, "_delete", False)
+
+        with st.form("delete_users_form"):
+            edited_df = st.data_editor(
+                users_df,
+                hide_index=True,
+                num_rows="fixed",
+                disabled=["id", "username", "role", "created_at"],
+                column_config={
+                    "_delete": st.column_config.CheckboxColumn("删除"),
+                    "id": st.column_config.NumberColumn("ID"),
+                    "username": st.column_config.TextColumn("用户名"),
+                    "role": st.column_config.TextColumn("角色"),
+                    "created_at": st.column_config.DatetimeColumn("创建时间", format="YYYY-MM-DD HH:mm:ss"),
+                },
+                key="users_editor",
+            )
+            submit_delete = st.form_submit_button("删除所选用户")
+
+        if submit_delete:
+            selected = edited_df[edited_df["_delete"]]
+            if st.session_state.username in selected["username"].values:
+                st.warning("不能删除当前登录的用户。")
+                selected = selected[selected["username"] != st.session_state.username]
+
+            if selected.empty:
+                st.info("请勾选要删除的用户。")
             else:
-                with col5:
-                    st.write("（当前用户）")
+                deleted_names = selected["username"].tolist()
+                try:
+                    delete_query = text("DELETE FROM users WHERE id IN :ids").bindparams(
+                        bindparam("ids", expanding=True))
+                    with engine.begin() as conn:
+                        conn.execute(delete_query, {"ids": selected["id"].tolist()})
+                    st.success(f"已删除用户：{', '.join(deleted_names)}")
+                    logger.info(
+                        f"管理员 '{st.session_state.username}' 删除了用户 {deleted_names} (ID: {selected['id'].tolist()})。")
+                    st.rerun()
+                except Exception as e:
+                    st.error(f"删除用户失败：{e}")
+                    logger.error(f"管理员 '{st.session_state.username}' 尝试删除用户 {deleted_names} 失败：{e}")
 
     except Exception as e:
         st.error(f"无法加载用户列表：{e}")